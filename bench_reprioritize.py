@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+优先级重评基准测试：用 generate_series 批量生成未完成任务与在线机器人，
+多次执行 run_reprioritization() 并打印 fetch / score / write 各阶段耗时，结束后清理数据。
+
+用法（需已执行 database_setup.py 建表）：
+  python3 bench_reprioritize.py --tasks 1000000 --robots 5000 --runs 3
+
+注意：库中已有的真实未完成任务也会参与重评。
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from database_setup import engine
+import reprioritize
+
+_SEED_SQL = [
+    """
+    INSERT INTO t_biz_target (coordinate, ripeness, area_code, image_url)
+    SELECT ST_SetSRID(ST_MakePoint(10 + random() * 80, 20 + random() * 60, 1.5), 4326),
+           random(), 'BENCH-' || (g % 20), ''
+    FROM generate_series(1, :tasks) g
+    """,
+    """
+    INSERT INTO t_biz_task (id, priority, status, type, created_at, target_id)
+    SELECT 'BENCH-' || tg.id, floor(random() * 3)::int,
+           CASE WHEN random() < 0.8 THEN 'PENDING' ELSE 'IN_PROGRESS' END, 'PICKING',
+           LOCALTIMESTAMP - random() * interval '3 days', tg.id
+    FROM t_biz_target tg
+    WHERE tg.area_code LIKE 'BENCH-%'
+    """,
+    """
+    INSERT INTO t_sys_robot (id, ip_address, battery_level, current_load, status, last_heartbeat)
+    SELECT 'BENCH-R' || g, '172.16.0.0'::inet + g, 80, 0,
+           CASE WHEN g % 2 = 0 THEN 'ONLINE' ELSE 'WORKING' END, LOCALTIMESTAMP
+    FROM generate_series(1, :robots) g
+    """,
+]
+
+# 每轮之间随机打乱优先级，使每次 write 阶段都有约 2/3 的任务需要写回
+_SHUFFLE_SQL = "UPDATE t_biz_task SET priority = floor(random() * 3)::int WHERE id LIKE 'BENCH-%'"
+
+_CLEANUP_SQL = [
+    "DELETE FROM t_biz_task WHERE id LIKE 'BENCH-%'",
+    "DELETE FROM t_biz_target WHERE area_code LIKE 'BENCH-%'",
+    "DELETE FROM t_sys_robot WHERE id LIKE 'BENCH-R%'",
+]
+
+
+def cleanup():
+    with engine.begin() as conn:
+        for sql in _CLEANUP_SQL:
+            conn.execute(text(sql))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务优先级重评基准测试")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--robots", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="测试结束后保留生成的数据")
+    args = parser.parse_args()
+
+    print(f"🚀 生成测试数据: {args.tasks} 个任务, {args.robots} 台机器人...")
+    cleanup()
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for sql in _SEED_SQL:
+            conn.execute(text(sql), {"tasks": args.tasks, "robots": args.robots})
+        conn.execute(text("ANALYZE t_biz_task"))
+        conn.execute(text("ANALYZE t_biz_target"))
+    print(f"   ✅ 数据生成完成 ({time.perf_counter() - t0:.1f}s)")
+
+    try:
+        print(f"\n{'轮次':<6}{'扫描':>10}{'变更':>10}{'写入':>10}{'fetch s':>10}{'score s':>10}{'write s':>10}{'total s':>10}")
+        for i in range(1, args.runs + 1):
+            with engine.begin() as conn:
+                conn.execute(text(_SHUFFLE_SQL))
+            r = reprioritize.run_reprioritization()
+            t = r["timings"]
+            print(f"{i:<6}{r['scanned']:>10}{r['changed']:>10}{r['written']:>10}"
+                  f"{t['fetch']:>10.3f}{t['score']:>10.3f}{t['write']:>10.3f}{r['total']:>10.3f}")
+    finally:
+        if not args.keep:
+            print("\n🗑️  清理测试数据...")
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
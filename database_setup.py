@@ -1,4 +1,5 @@
 import uuid
+import hashlib
 from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, ForeignKey, text, BigInteger, CheckConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.postgresql import INET  # 对应文档中的 INET 类型
@@ -109,8 +110,8 @@ class Task(Base):
     # created_by: VARCHAR(36), FK
     created_by = Column(String(36), ForeignKey('t_sys_user.id'))
     
-    # assigned_robot_id: VARCHAR(36), FK
-    assigned_robot_id = Column(String(36), ForeignKey('t_sys_robot.id'))
+    # assigned_robot_id: VARCHAR(36), FK (建索引，供终端按自身 ID 轮询任务)
+    assigned_robot_id = Column(String(36), ForeignKey('t_sys_robot.id'), index=True)
     
     # target_id: BIGINT, FK, UNIQUE (注意这里必须是 BigInteger 以匹配 Target.id)
     target_id = Column(BigInteger, ForeignKey('t_biz_target.id'), unique=True)
@@ -145,6 +146,13 @@ class SystemLog(Base):
     robot = relationship("Robot", back_populates="logs")
 
 
+# --- 机器人地图坐标 ---
+# 终端表未存储位置，地图展示与任务调度统一由 ID 哈希推算坐标
+def robot_position(robot_id):
+    h = int(hashlib.sha256(robot_id.encode('utf-8')).hexdigest(), 16)
+    return h % 80 + 10, (h // 100) % 60 + 20
+
+
 # --- 3. 执行建表 (带清理旧表功能) ---
 def init_db():
     print("正在连接数据库...")
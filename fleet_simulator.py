@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+机群规模压测模拟器：多进程 + asyncio 模拟 N 台虚拟机器人，逐级放大机群规模，
+找出当前部署在多大规模时开始"扛不住"。
+
+每台虚拟机器人的生命周期（全部走真实 HTTP 接口）：
+  1. POST /api/robots           注册上线
+  2. PUT  /api/robots/{id}      周期性心跳（电量 / 负载 / 状态）
+  3. POST /api/tasks            调度方按泊松到达为其派发采摘任务
+  4. GET  /api/tasks?assigned_robot_id=...&status=PENDING
+                                带抖动轮询领取分配给自己的任务（按机器人过滤，避免
+                                全表轮询本身成为瓶颈而掩盖真实的机群流量）
+  5. PUT  /api/tasks/{id}       IN_PROGRESS -> 在果园内移动、采摘 -> COMPLETED
+
+用法示例（先启动 python3 main.py）：
+  python3 fleet_simulator.py --sizes 10,100,1000,5000 --duration 120 --workers 8
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+# 果园坐标范围（与 /api/map/objects 中机器人的坐标范围保持一致）
+ORCHARD_X = (10.0, 90.0)
+ORCHARD_Y = (20.0, 80.0)
+AREA_CODES = ["Area-A", "Area-B", "Area-C", "Area-D"]
+
+
+# --- 统计工具 ---
+def _new_stats():
+    return {"requests": {}, "task_latency": [], "tasks_dispatched": 0,
+            "tasks_completed": 0, "registered": 0, "loop_lag": [],
+            "tasks_unfinished": 0, "robot_errors": 0, "leaked_tasks": 0, "leaked_robots": 0}
+
+def _merge_stats(results):
+    merged = _new_stats()
+    for s in results:
+        for name, rec in s["requests"].items():
+            m = merged["requests"].setdefault(name, {"ok": 0, "err": 0, "lat": []})
+            m["ok"] += rec["ok"]
+            m["err"] += rec["err"]
+            m["lat"].extend(rec["lat"])
+        for key in ("task_latency", "loop_lag"):
+            merged[key].extend(s[key])
+        for key in ("tasks_dispatched", "tasks_completed", "tasks_unfinished", "registered",
+                    "robot_errors", "leaked_tasks", "leaked_robots"):
+            merged[key] += s[key]
+    return merged
+
+def _percentiles(samples, qs=(0.5, 0.95, 0.99)):
+    if not samples:
+        return [float("nan")] * len(qs)
+    s = sorted(samples)
+    return [s[min(len(s) - 1, int(q * len(s)))] for q in qs]
+
+async def _call(client, stats, name, method, url, **kwargs):
+    """发起一次请求并记录耗时与成败，失败返回 None"""
+    rec = stats["requests"].setdefault(name, {"ok": 0, "err": 0, "lat": []})
+    t0 = time.perf_counter()
+    try:
+        resp = await client.request(method, url, **kwargs)
+        ok = resp.status_code < 400
+    except httpx.HTTPError:
+        resp, ok = None, False
+    rec["lat"].append(time.perf_counter() - t0)
+    rec["ok" if ok else "err"] += 1
+    return resp if ok else None
+
+
+# --- 虚拟机器人 ---
+class VirtualRobot:
+    def __init__(self, robot_id, ip_address, client, stats, args):
+        self.id = robot_id
+        self.ip_address = ip_address
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.x = random.uniform(*ORCHARD_X)
+        self.y = random.uniform(*ORCHARD_Y)
+        self.battery = random.uniform(60.0, 100.0)
+        self.load = 0.0
+        self.status = "ONLINE"
+        self.dispatched = {}  # task_id -> 派发时间戳
+        self.seen_tasks = set()
+
+    async def run(self, deadline, start_delay):
+        # 错峰上线，避免所有机器人同一时刻注册
+        await asyncio.sleep(start_delay)
+        resp = await _call(self.client, self.stats, "POST /api/robots", "POST", "/api/robots", json={
+            "id": self.id, "ip_address": self.ip_address,
+            "battery_level": round(self.battery, 1), "current_load": self.load, "status": self.status
+        })
+        if resp is None:
+            return
+        self.stats["registered"] += 1
+        await asyncio.gather(
+            self._heartbeat_loop(deadline),
+            self._dispatch_loop(deadline),
+            self._work_loop(deadline),
+        )
+
+    async def _sleep_until(self, delay, deadline):
+        await asyncio.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+
+    async def _heartbeat_loop(self, deadline):
+        while time.monotonic() < deadline:
+            await _call(self.client, self.stats, "PUT /api/robots/{id}", "PUT", f"/api/robots/{self.id}", json={
+                "battery_level": round(self.battery, 1), "current_load": round(self.load, 1), "status": self.status
+            })
+            await self._sleep_until(self.args.heartbeat_interval, deadline)
+
+    async def _dispatch_loop(self, deadline):
+        # 模拟调度中心：任务到达服从泊松过程
+        while True:
+            await self._sleep_until(random.expovariate(1.0 / self.args.task_interval), deadline)
+            if time.monotonic() >= deadline:
+                return
+            resp = await _call(self.client, self.stats, "POST /api/tasks", "POST", "/api/tasks", json={
+                "priority": random.randint(0, 2), "type": "PICKING",
+                "target_area": random.choice(AREA_CODES), "assigned_robot_id": self.id
+            })
+            task_id = resp.json().get("task_id") if resp is not None else None
+            if task_id:
+                self.dispatched[task_id] = time.monotonic()
+                self.stats["tasks_dispatched"] += 1
+
+    async def _work_loop(self, deadline):
+        while time.monotonic() < deadline:
+            resp = await _call(self.client, self.stats, "GET /api/tasks", "GET", "/api/tasks",
+                               params={"assigned_robot_id": self.id, "status": "PENDING"})
+            mine = []
+            if resp is not None:
+                mine = [t for t in resp.json() if t["full_id"] not in self.seen_tasks]
+            for t in mine:
+                if time.monotonic() >= deadline:
+                    return
+                self.seen_tasks.add(t["full_id"])
+                # 客户端超时但服务端已提交的任务没有派发时间，照常执行但不计入延迟
+                await self._execute(t["full_id"], self.dispatched.get(t["full_id"]), deadline)
+            if not mine:
+                # 加抖动，避免同批上线的机器人同步轮询
+                await self._sleep_until(self.args.poll_interval * random.uniform(0.5, 1.5), deadline)
+
+    async def _execute(self, task_id, dispatched_at, deadline):
+        url = f"/api/tasks/{task_id}"
+        if await _call(self.client, self.stats, "PUT /api/tasks/{id}", "PUT", url, json={"status": "IN_PROGRESS"}) is None:
+            return
+        self.status = "WORKING"
+        # 行驶到随机果树位置并采摘
+        tx, ty = random.uniform(*ORCHARD_X), random.uniform(*ORCHARD_Y)
+        distance = math.hypot(tx - self.x, ty - self.y)
+        await self._sleep_until(distance / self.args.speed + self.args.pick_time, deadline)
+        if time.monotonic() >= deadline:
+            # 本轮结束时仍在执行的任务不算完成，否则会以截断的耗时拉低延迟分位数
+            self.stats["tasks_unfinished"] += 1
+            return
+        self.x, self.y = tx, ty
+        self.battery = max(5.0, self.battery - distance * 0.05)
+        self.load += random.uniform(0.2, 0.6)
+        self.status = "ONLINE"
+        if await _call(self.client, self.stats, "PUT /api/tasks/{id}", "PUT", url, json={"status": "COMPLETED"}) is None:
+            return
+        self.stats["tasks_completed"] += 1
+        if dispatched_at is not None:
+            self.stats["task_latency"].append(time.monotonic() - dispatched_at)
+
+
+# --- 单进程分片 ---
+async def _monitor_loop_lag(stats, deadline, interval=0.5):
+    """事件循环延迟：过高说明模拟器自身已饱和，结果不可信"""
+    while time.monotonic() < deadline:
+        t0 = time.monotonic()
+        await asyncio.sleep(interval)
+        stats["loop_lag"].append(time.monotonic() - t0 - interval)
+
+async def _probe_loop(client, stats, deadline, interval=1.0):
+    """轻量探针：周期性请求仪表盘统计，用其延迟衡量服务端排队程度"""
+    while time.monotonic() < deadline:
+        await _call(client, stats, "probe", "GET", "/api/dashboard/stats")
+        await asyncio.sleep(interval)
+
+async def _retry(request, attempts=3):
+    """带指数退避的重试，最终失败返回 None"""
+    for attempt in range(attempts):
+        try:
+            resp = await request()
+            resp.raise_for_status()
+            return resp
+        except httpx.HTTPError:
+            if attempt < attempts - 1:
+                await asyncio.sleep(2 ** attempt)
+    return None
+
+async def _cleanup(client, robots, stats):
+    """删除本分片创建的任务与机器人，避免污染下一轮；清理失败的数量记入 stats"""
+    owner = {tid: r.id for r in robots for tid in (*r.dispatched, *r.seen_tasks)}
+    # 兜底：客户端超时但服务端已提交的任务只能通过任务列表找回
+    resp = await _retry(lambda: client.get("/api/tasks", timeout=max(60.0, client.timeout.read or 0)))
+    if resp is not None:
+        ids = {r.id for r in robots}
+        owner.update((t["full_id"], t["assigned_to"]) for t in resp.json() if t["assigned_to"] in ids)
+    else:
+        print("  ⚠️  清理时获取任务列表失败，仅按已记录的任务 ID 删除")
+    sem = asyncio.Semaphore(32)
+
+    async def _delete(url):
+        async with sem:
+            return await _retry(lambda: client.delete(url)) is not None
+
+    task_ids = list(owner)
+    results = await asyncio.gather(*(_delete(f"/api/tasks/{tid}") for tid in task_ids))
+    failed = {tid for tid, ok in zip(task_ids, results) if not ok}
+    # 任务未删净的机器人保留不删，否则任务的 assigned_robot_id 被置空后无法再追溯
+    keep = {owner[tid] for tid in failed}
+    robot_ids = [r.id for r in robots if r.id not in keep]
+    results = await asyncio.gather(*(_delete(f"/api/robots/{rid}") for rid in robot_ids))
+    stats["leaked_tasks"] += len(failed)
+    stats["leaked_robots"] += len(keep) + results.count(False)
+
+async def _run_shard_async(args, indices, run_tag, with_probe):
+    stats = _new_stats()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    ip_base = int(run_tag, 16) % (2 ** 24 - args.max_robots)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        robots = []
+        for i in indices:
+            n = ip_base + i
+            ip = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+            robots.append(VirtualRobot(f"SIM-{run_tag}-{i:05d}", ip, client, stats, args))
+        deadline = time.monotonic() + args.duration
+        jobs = [r.run(deadline, random.uniform(0, args.ramp)) for r in robots]
+        jobs.append(_monitor_loop_lag(stats, deadline))
+        if with_probe:
+            jobs.append(_probe_loop(client, stats, deadline))
+        try:
+            # 单台机器人的异常不应拖垮整个分片
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+            errors = [e for e in results if isinstance(e, Exception)]
+            stats["robot_errors"] += len(errors)
+            if errors:
+                print(f"  ⚠️  {len(errors)} 个虚拟机器人异常退出，例如: {errors[0]!r}")
+        finally:
+            # 中断 (Ctrl-C) 时同样要清理，避免 SIM-* 数据残留影响下一轮
+            await _cleanup(client, robots, stats)
+    return stats
+
+def _run_shard(args, indices, run_tag, with_probe):
+    return asyncio.run(_run_shard_async(args, indices, run_tag, with_probe))
+
+
+# --- 逐级压测 ---
+def run_stage(args, n_robots):
+    run_tag = uuid.uuid4().hex[:6]
+    workers = max(1, min(args.workers, n_robots))
+    shards = [list(range(w, n_robots, workers)) for w in range(workers)]
+    probes = [w == 0 for w in range(workers)]
+    t0 = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_run_shard, [args] * workers, shards, [run_tag] * workers, probes))
+    stats = _merge_stats(results)
+    stats["wall_time"] = time.monotonic() - t0
+    return stats
+
+def summarize(n_robots, stats, args):
+    reqs = {k: v for k, v in stats["requests"].items() if k != "probe"}
+    total = sum(r["ok"] + r["err"] for r in reqs.values())
+    errors = sum(r["err"] for r in reqs.values())
+    probe = stats["requests"].get("probe", {"lat": []})
+    summary = {
+        "robots": n_robots,
+        "registered": stats["registered"],
+        "requests": total,
+        "throughput_rps": total / args.duration,
+        "error_rate": errors / total if total else 0.0,
+        "endpoints": {},
+        "tasks_dispatched": stats["tasks_dispatched"],
+        "tasks_completed": stats["tasks_completed"],
+        "tasks_unfinished": stats["tasks_unfinished"],
+        "robot_errors": stats["robot_errors"],
+        "task_latency_p50_p95_p99": _percentiles(stats["task_latency"]),
+        "probe_latency_p50_p95_p99": _percentiles(probe["lat"]),
+        "client_loop_lag_p99": _percentiles(stats["loop_lag"], (0.99,))[0],
+        "leaked_tasks": stats["leaked_tasks"],
+        "leaked_robots": stats["leaked_robots"],
+    }
+    for name, rec in sorted(reqs.items()):
+        count = rec["ok"] + rec["err"]
+        summary["endpoints"][name] = {
+            "count": count, "error_rate": rec["err"] / count if count else 0.0,
+            "latency_p50_p95_p99": _percentiles(rec["lat"]),
+        }
+    summary["saturated"] = (summary["error_rate"] > args.max_error_rate
+                            or summary["probe_latency_p50_p95_p99"][1] > args.max_probe_p95)
+    return summary
+
+def print_summary(s):
+    ms = lambda v: "   nan" if math.isnan(v) else f"{v * 1000:6.0f}"
+    print(f"\n{'=' * 80}")
+    print(f" 🤖 机群规模 N={s['robots']}  (注册成功 {s['registered']})")
+    print(f"{'-' * 80}")
+    print(f"  请求总数 {s['requests']}  吞吐 {s['throughput_rps']:.1f} req/s  错误率 {s['error_rate'] * 100:.2f}%")
+    print(f"  {'接口':<24}{'次数':>8}{'错误率':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, e in s["endpoints"].items():
+        p50, p95, p99 = e["latency_p50_p95_p99"]
+        print(f"  {name:<24}{e['count']:>8}{e['error_rate'] * 100:>8.2f}%{ms(p50):>9}{ms(p95):>9}{ms(p99):>9}")
+    p50, p95, p99 = s["task_latency_p50_p95_p99"]
+    print(f"  任务端到端延迟 (派发->完成): 完成 {s['tasks_completed']}/{s['tasks_dispatched']}"
+          f" (轮次结束时未完成 {s['tasks_unfinished']})  p50 {p50:.1f}s  p95 {p95:.1f}s  p99 {p99:.1f}s")
+    p50, p95, p99 = s["probe_latency_p50_p95_p99"]
+    print(f"  服务端探针延迟 (GET /api/dashboard/stats): p50 {ms(p50)} ms  p95 {ms(p95)} ms  p99 {ms(p99)} ms")
+    lag = s["client_loop_lag_p99"]
+    if not math.isnan(lag) and lag > 0.5:
+        print(f"  ⚠️  模拟器事件循环延迟 p99={lag:.2f}s，客户端已饱和，请增加 --workers")
+    if s["robot_errors"]:
+        print(f"  ⚠️  {s['robot_errors']} 个虚拟机器人异常退出")
+    if s["leaked_tasks"] or s["leaked_robots"]:
+        print(f"  ⚠️  清理失败: 残留任务 {s['leaked_tasks']} 个、机器人 {s['leaked_robots']} 台 (ID 前缀 SIM-)")
+    print(f"  {'❌ 服务端已饱和' if s['saturated'] else '✅ 服务正常'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="CitrusLink 机群规模压测模拟器")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--sizes", default="10,50,100,500,1000,2000,5000", help="逐级测试的机群规模，逗号分隔")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="模拟进程数")
+    parser.add_argument("--duration", type=float, default=120.0, help="每级持续时间 (秒)")
+    parser.add_argument("--ramp", type=float, default=10.0, help="错峰上线窗口 (秒)")
+    parser.add_argument("--heartbeat-interval", type=float, default=5.0, help="心跳间隔 (秒)")
+    parser.add_argument("--task-interval", type=float, default=30.0, help="每台机器人平均任务到达间隔 (秒)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="任务轮询间隔 (秒)")
+    parser.add_argument("--speed", type=float, default=2.0, help="行驶速度 (坐标单位/秒)")
+    parser.add_argument("--pick-time", type=float, default=5.0, help="单次采摘耗时 (秒)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="单次请求超时 (秒)")
+    parser.add_argument("--max-connections", type=int, default=200, help="每个进程的 HTTP 连接上限")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="判定饱和的错误率阈值")
+    parser.add_argument("--max-probe-p95", type=float, default=1.0, help="判定饱和的探针 p95 延迟阈值 (秒)")
+    parser.add_argument("--keep-going", action="store_true", help="饱和后继续测试更大规模")
+    parser.add_argument("--json", help="将各级结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    args.max_robots = max(sizes)
+    print("🚀 CitrusLink 机群压测开始")
+    print(f"👉 目标: {args.base_url}  规模: {sizes}  进程数: {args.workers}  每级 {args.duration:.0f}s")
+
+    summaries = []
+    for n in sizes:
+        summary = summarize(n, run_stage(args, n), args)
+        summaries.append(summary)
+        print_summary(summary)
+        if summary["saturated"] and not args.keep_going:
+            break
+
+    print(f"\n{'=' * 80}")
+    broken = [s["robots"] for s in summaries if s["saturated"]]
+    if broken:
+        healthy = [s["robots"] for s in summaries if not s["saturated"] and s["robots"] < broken[0]]
+        print(f"📉 饱和点: N={broken[0]} (最后正常规模: N={max(healthy) if healthy else '无'})")
+    else:
+        print(f"✅ 所有规模均未饱和 (最大 N={sizes[-1]})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+        print(f"📝 结果已写入 {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
@@ -12,13 +14,41 @@ from datetime import datetime
 from geoalchemy2.elements import WKTElement
 import json
 import uuid
-import hashlib
 
 # 导入数据库模型
-from database_setup import engine, Robot, Task, Target, SystemLog, User
+from database_setup import engine, Robot, Task, Target, SystemLog, User, robot_position
+import reprioritize
+
+# --- 后台任务：定时重评任务优先级 ---
+# 间隔（秒），设为 0 关闭
+REPRIORITIZE_INTERVAL = float(os.environ.get("REPRIORITIZE_INTERVAL", "300"))
+reprioritize_job = None
+
+async def reprioritize_loop():
+    while True:
+        await asyncio.sleep(REPRIORITIZE_INTERVAL)
+        try:
+            result = await asyncio.to_thread(reprioritize.run_reprioritization)
+            print(f"🔄 优先级重评完成: {result}")
+        except Exception as e:
+            print(f"❌ 优先级重评失败: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    global reprioritize_job
+    if REPRIORITIZE_INTERVAL > 0:
+        # 保存引用：事件循环只持有任务的弱引用
+        reprioritize_job = asyncio.create_task(reprioritize_loop())
+    yield
+    if reprioritize_job:
+        reprioritize_job.cancel()
+        try:
+            await reprioritize_job
+        except asyncio.CancelledError:
+            pass
 
 # --- 初始化 ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # 允许跨域
 app.add_middleware(
@@ -93,8 +123,11 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
     }
 
 @app.get("/api/tasks")
-def get_tasks(db: Session = Depends(get_db)):
-    tasks = db.query(Task).all()
+def get_tasks(assigned_robot_id: Optional[str] = None, status: Optional[str] = None, db: Session = Depends(get_db)):
+    query = db.query(Task)
+    if assigned_robot_id: query = query.filter(Task.assigned_robot_id == assigned_robot_id)
+    if status: query = query.filter(Task.status == status)
+    tasks = query.all()
     result = []
     for t in tasks:
         target_area = t.target.area_code if t.target else "Unknown"
@@ -125,10 +158,10 @@ def get_map_objects(db: Session = Depends(get_db)):
     robots = db.query(Robot).all()
     robot_list = []
     for r in robots:
-        h = int(hashlib.sha256(r.id.encode('utf-8')).hexdigest(), 16)
+        x, y = robot_position(r.id)
         robot_list.append({
             "id": r.id, "type": "UGV", "status": r.status,
-            "x": h % 80 + 10, "y": (h // 100) % 60 + 20
+            "x": x, "y": y
         })
     
     targets = db.query(Target, func.ST_X(Target.coordinate), func.ST_Y(Target.coordinate)).all()
@@ -158,7 +191,7 @@ def create_task(task_data: TaskCreate, db: Session = Depends(get_db)):
         )
         db.add(new_task)
         db.commit()
-        return {"success": True, "message": "Task created"}
+        return {"success": True, "message": "Task created", "task_id": new_task.id}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -173,6 +206,18 @@ def update_task(task_id: str, task_data: TaskUpdate, db: Session = Depends(get_d
     db.commit()
     return {"success": True}
 
+# 按成熟度/等待时长/距离/区域积压批量重评所有未完成任务的优先级
+@app.post("/api/tasks/reprioritize")
+def reprioritize_tasks():
+    try:
+        return reprioritize.run_reprioritization()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/tasks/reprioritize")
+def get_last_reprioritization():
+    return reprioritize.last_run or {}
+
 @app.delete("/api/tasks/{task_id}")
 def delete_task(task_id: str, db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.id == task_id).first()
@@ -195,6 +240,18 @@ def create_robot(robot_data: RobotCreate, db: Session = Depends(get_db)):
     db.commit()
     return {"success": True}
 
+# 终端心跳：上报电量/负载/状态，并刷新 last_heartbeat
+@app.put("/api/robots/{robot_id}")
+def update_robot(robot_id: str, robot_data: RobotUpdate, db: Session = Depends(get_db)):
+    robot = db.query(Robot).filter(Robot.id == robot_id).first()
+    if not robot: raise HTTPException(status_code=404, detail="Not found")
+    if robot_data.battery_level is not None: robot.battery_level = robot_data.battery_level
+    if robot_data.current_load is not None: robot.current_load = robot_data.current_load
+    if robot_data.status: robot.status = robot_data.status
+    robot.last_heartbeat = datetime.now()
+    db.commit()
+    return {"success": True}
+
 @app.delete("/api/robots/{robot_id}")
 def delete_robot(robot_id: str, db: Session = Depends(get_db)):
     robot = db.query(Robot).filter(Robot.id == robot_id).first()
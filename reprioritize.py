@@ -0,0 +1,188 @@
+"""
+批量任务优先级重评：根据果实成熟度、任务等待时长、最近在线机器人距离、
+区域积压量，对所有未完成任务一次性重新打分，并用一条集合式 UPDATE 写回。
+
+流程分三个阶段，每个阶段单独计时：
+  fetch  一次查询取出全部未完成任务的打分特征
+  score  NumPy 向量化计算分数并映射为 0/1/2 优先级
+  write  仅对优先级发生变化的任务执行 UPDATE ... FROM unnest(...)
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from database_setup import engine, robot_position
+
+# 未完成任务的状态（COMPLETED / FAILED 为终态）
+OPEN_STATUSES = ('PENDING', 'IN_PROGRESS')
+_OPEN_STATUS_SQL = ", ".join(f"'{s}'" for s in OPEN_STATUSES)
+
+# --- 打分参数 ---
+W_RIPENESS = 0.45   # 成熟度（过熟果实最紧急）
+W_AGE = 0.20        # 任务等待时长
+W_DISTANCE = 0.15   # 距最近在线机器人的距离（越近越优先）
+W_BACKLOG = 0.20    # 所在区域的积压量
+AGE_SCALE_HOURS = 24.0
+DISTANCE_SCALE = 30.0
+DISTANCE_RESOLUTION = 0.5  # 距离计算时的坐标量化精度
+ACTIVE_ROBOT_STATUSES = ('ONLINE', 'WORKING')  # 参与距离计算的机器人状态
+HEARTBEAT_TIMEOUT_SECONDS = 120  # 超过该时长无心跳的机器人视为离线
+PRIORITY_THRESHOLDS = [0.35, 0.65]  # 分数 -> Low(0) / Medium(1) / High(2)
+
+# 控制单次计算中 (任务 x 机器人) 距离矩阵的元素数，避免百万级任务时内存爆炸
+_DISTANCE_CHUNK_ELEMS = 1 << 22
+
+# 按列聚合一次返回：避免逐行构造 Python 元组；数值列以逗号分隔文本返回，
+# 由 NumPy 在 C 层直接解析，不经过 Python float 对象
+_FETCH_SQL = f"""
+    SELECT array_agg(id),
+           array_to_string(array_agg(priority), ','),
+           array_to_string(array_agg(ripeness), ','),
+           array_to_string(array_agg(age), ','),
+           array_to_string(array_agg(x), ','),
+           array_to_string(array_agg(y), ','),
+           array_to_string(array_agg(backlog), ',')
+    FROM (
+        SELECT t.id,
+               t.priority,
+               COALESCE(tg.ripeness, 0)::float8 AS ripeness,
+               COALESCE(EXTRACT(EPOCH FROM (LOCALTIMESTAMP - t.created_at)), 0)::float8 AS age,
+               COALESCE(ST_X(tg.coordinate), 'NaN')::float8 AS x,
+               COALESCE(ST_Y(tg.coordinate), 'NaN')::float8 AS y,
+               COUNT(*) OVER (PARTITION BY tg.area_code) AS backlog  -- 窗口函数在 WHERE 之后计算，只统计未完成任务
+        FROM t_biz_task t
+        LEFT JOIN t_biz_target tg ON tg.id = t.target_id
+        WHERE t.status IN ({_OPEN_STATUS_SQL})
+    ) s
+"""
+
+_ROBOT_SQL = f"""
+    SELECT id FROM t_sys_robot
+    WHERE status IN ({", ".join(f"'{s}'" for s in ACTIVE_ROBOT_STATUSES)})
+      AND last_heartbeat > LOCALTIMESTAMP - make_interval(secs => %s)
+"""
+
+_WRITE_SQL = f"""
+    UPDATE t_biz_task AS t
+    SET priority = v.priority
+    FROM unnest(%s::varchar[], %s::int[], %s::int[]) AS v(id, priority, old_priority)
+    WHERE t.id = v.id
+      AND t.priority = v.old_priority
+      AND t.status IN ({_OPEN_STATUS_SQL})
+"""
+
+_lock = threading.Lock()
+last_run = None
+
+
+def _parse_column(text, dtype=float):
+    return np.fromstring(text, dtype=dtype, sep=',') if text else np.empty(0, dtype=dtype)
+
+
+def nearest_distance(px, py, rx, ry):
+    """每个目标点到最近机器人的欧氏距离；坐标缺失或无机器人时为 inf
+
+    目标坐标先按 DISTANCE_RESOLUTION 量化去重，只对去重后的格点计算距离矩阵，
+    百万级任务在果园范围内通常只剩几万个格点。
+    """
+    out = np.full(px.shape, np.inf)
+    valid = np.isfinite(px) & np.isfinite(py)
+    if rx.size == 0 or not valid.any():
+        return out
+    qx = np.round(px[valid] / DISTANCE_RESOLUTION).astype(np.int64)
+    qy = np.round(py[valid] / DISTANCE_RESOLUTION).astype(np.int64)
+    x_min, y_min = qx.min(), qy.min()
+    qx -= x_min
+    qy -= y_min
+    span_y = int(qy.max()) + 1
+    keys, inverse = np.unique(qx * span_y + qy, return_inverse=True)
+    ux = (keys // span_y + x_min) * DISTANCE_RESOLUTION
+    uy = (keys % span_y + y_min) * DISTANCE_RESOLUTION
+
+    dist = np.empty(keys.shape)
+    step = max(1, _DISTANCE_CHUNK_ELEMS // rx.size)
+    for s in range(0, keys.size, step):
+        dx = ux[s:s + step, None] - rx[None, :]
+        dy = uy[s:s + step, None] - ry[None, :]
+        dist[s:s + step] = np.sqrt((dx * dx + dy * dy).min(axis=1))
+    out[valid] = dist[inverse.ravel()]
+    return out
+
+
+def score_tasks(ripeness, age_seconds, distance, backlog):
+    """向量化打分，返回 [0, 1] 区间的分数"""
+    ripeness_term = np.clip(ripeness, 0.0, 1.0)
+    age_term = 1.0 - np.exp(-np.maximum(age_seconds, 0.0) / (AGE_SCALE_HOURS * 3600.0))
+    # 坐标缺失或无在线机器人时 distance 为 inf，距离项自然为 0
+    distance_term = np.exp(-distance / DISTANCE_SCALE)
+    max_backlog = backlog.max() if backlog.size else 0
+    backlog_term = backlog / max_backlog if max_backlog > 0 else np.zeros_like(backlog, dtype=float)
+    return (W_RIPENESS * ripeness_term + W_AGE * age_term
+            + W_DISTANCE * distance_term + W_BACKLOG * backlog_term)
+
+
+def score_to_priority(score):
+    return np.digitize(score, PRIORITY_THRESHOLDS).astype(np.int32)
+
+
+def run_reprioritization():
+    """执行一次全量重评，返回各阶段耗时与变更数量"""
+    global last_run
+    with _lock:
+        timings = {}
+        conn = engine.raw_connection()
+        try:
+            cur = conn.cursor()
+
+            # 1. fetch
+            t0 = time.perf_counter()
+            cur.execute(_FETCH_SQL)
+            ids, priority, ripeness, age, x, y, backlog = cur.fetchone()
+            cur.execute(_ROBOT_SQL, (HEARTBEAT_TIMEOUT_SECONDS,))
+            robot_ids = [r[0] for r in cur.fetchall()]
+            scanned = len(ids) if ids else 0
+            if scanned:
+                ids = np.array(ids, dtype=object)
+                priority = _parse_column(priority, np.int32)
+                ripeness = _parse_column(ripeness)
+                age = _parse_column(age)
+                x = _parse_column(x)
+                y = _parse_column(y)
+                backlog = _parse_column(backlog)
+            timings["fetch"] = time.perf_counter() - t0
+
+            # 2. score
+            t0 = time.perf_counter()
+            changed = written = 0
+            if scanned:
+                # 同一格点上的机器人只需保留一个
+                positions = np.unique(np.array([robot_position(r) for r in robot_ids], dtype=float).reshape(-1, 2), axis=0)
+                distance = nearest_distance(x, y, positions[:, 0], positions[:, 1])
+                new_priority = score_to_priority(score_tasks(ripeness, age, distance, backlog))
+                mask = new_priority != priority
+                changed = int(mask.sum())
+            timings["score"] = time.perf_counter() - t0
+
+            # 3. write
+            t0 = time.perf_counter()
+            if changed:
+                # 仅更新 fetch 之后未被改动的行：期间完成/失败或被人工改过优先级的任务保持不变
+                cur.execute(_WRITE_SQL, (ids[mask].tolist(), new_priority[mask].tolist(), priority[mask].tolist()))
+                written = cur.rowcount
+            conn.commit()
+            timings["write"] = time.perf_counter() - t0
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        last_run = {
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "scanned": scanned, "changed": changed, "written": written, "online_robots": len(robot_ids),
+            "timings": {k: round(v, 4) for k, v in timings.items()},
+            "total": round(sum(timings.values()), 4),
+        }
+        return last_run